@@ -0,0 +1,116 @@
+import time
+import numpy as np
+from transportation import Transportation, dual_bound, flow_cost
+
+
+class JonkerVolgenant:
+    """
+    Shortest augmenting path solver for assignment problems (square, every
+    supply and demand equal to 1), in the style of Jonker and Volgenant.
+
+    Column reduction gives the start: v_j = min_i cost_ij, u = 0, and each
+    column is assigned to its cheapest row if that row is still free. Every
+    remaining free row is then matched by a Dijkstra search over the columns
+    on reduced costs cost_ij - u_i - v_j, one vectorized step per scanned
+    row, followed by a potential update and the augmentation along the
+    path. u_i + v_j = cost_ij holds on every assigned cell, as in MODI.
+    """
+
+    def __init__(self, trans, bfs=None):
+        if not isinstance(trans, Transportation):
+            raise TypeError("JonkerVolgenant needs a Transportation instance")
+        if not trans.is_assignment():
+            raise ValueError("not an assignment problem (square with unit supply and demand)")
+        if bfs is not None:
+            raise ValueError("the assignment solver starts from its own column reduction")
+        self.trans = trans
+        self.cost = trans.cost
+        self.scale = trans.scale
+        self.n = self.m = n = self.cost.shape[0]
+        self.supply = trans.supply
+        self.demand = trans.demand
+
+        self.col_of_row = np.full(n, -1)
+        self.row_of_col = np.full(n, -1)
+        self.u = np.zeros(n)
+        self.v = np.zeros(n)
+        self.stats = {"initial_matches": 0, "augmentations": 0, "scanned": 0}
+        self._column_reduction()
+
+    def _column_reduction(self):
+        if not self.n:
+            return
+        rows = self.cost.argmin(axis=0)
+        self.v = self.cost[rows, np.arange(self.n)].astype(float)
+        for j, i in enumerate(rows.tolist()):
+            if self.col_of_row[i] < 0:
+                self.col_of_row[i] = j
+                self.row_of_col[j] = i
+                self.stats["initial_matches"] += 1
+
+    def _augment(self, start):
+        n, cost, u, v = self.n, self.cost, self.u, self.v
+        shortest = np.full(n, np.inf)
+        pred = np.full(n, -1)
+        col_done = np.zeros(n, dtype=bool)
+        rows = [start]
+
+        i, reached = start, 0.0
+        while True:
+            reach = reached + cost[i] - u[i] - v
+            better = ~col_done & (reach < shortest)
+            shortest[better] = reach[better]
+            pred[better] = i
+
+            open_ = np.where(col_done, np.inf, shortest)
+            j = int(np.argmin(open_))
+            reached = open_[j]
+            col_done[j] = True
+            self.stats["scanned"] += 1
+            if self.row_of_col[j] < 0:
+                break
+            i = int(self.row_of_col[j])
+            rows.append(i)
+
+        # keep reduced costs nonnegative and tight along the new matching
+        u[start] += reached
+        others = np.array(rows[1:], dtype=int)
+        if others.size:
+            u[others] += reached - shortest[self.col_of_row[others]]
+        v[col_done] -= reached - shortest[col_done]
+
+        while True:
+            i = int(pred[j])
+            self.row_of_col[j] = i
+            j, self.col_of_row[i] = self.col_of_row[i], j
+            if i == start:
+                break
+
+    def lower_bound(self):
+        """dual_bound() from the column potentials, valid after any augmentation."""
+        return dual_bound(self.cost, self.v, self.supply, self.demand, self.scale)
+
+    def solve(self, max_iter=None, time_limit=None):
+        """
+        Match every free row, or stop when a budget (max_iter augmentations,
+        time_limit seconds) runs out; self.status tells which. Returns
+        {(i, j): 1} and the total cost.
+        """
+        began = time.perf_counter()
+        self.status = "optimal"
+        for i in np.flatnonzero(self.col_of_row < 0).tolist():
+            if max_iter is not None and self.stats["augmentations"] >= max_iter:
+                self.status = "iteration_limit"
+                break
+            if time_limit is not None and time.perf_counter() - began >= time_limit:
+                self.status = "time_limit"
+                break
+            self._augment(i)
+            self.stats["augmentations"] += 1
+
+        one = self.supply.dtype.type(1).item()
+        self.alloc = {(i, int(j)): one for i, j in enumerate(self.col_of_row.tolist()) if j >= 0}
+        return self.alloc, self.cost_value()
+
+    def cost_value(self):
+        return flow_cost(self.cost, self.alloc, self.scale)
@@ -0,0 +1,154 @@
+import time
+import numpy as np
+from transportation import Transportation, dual_bound, flow_cost, scale_to_int
+
+
+class CostScaling:
+    """
+    Cost-scaling push-relabel (Goldberg-Tarjan) on the transportation network.
+
+    Costs are scaled to integers and multiplied by N + 1 (N = n + m nodes),
+    so an epsilon-optimal flow with epsilon = 1 is optimal. Every cell is an
+    arc row -> column with capacity min(s_i, d_j). Each refine divides
+    epsilon by alpha, saturates or empties every arc with a nonzero reduced
+    cost cost + p[row] - p[column], and then discharges in sweeps: all
+    active rows push along their admissible cells in one 2-D step, then all
+    active columns push back along the cells that carry flow into them, and
+    the nodes still active relabel to the best residual arc minus epsilon.
+    Rows only neighbour columns, so the nodes of one sweep never interfere.
+
+    The work depends on the number of scaling phases and sweeps, not on
+    the number of simplex pivots: on the bundled 200x180 and 300x300 files
+    it runs about as fast as VAM + MODI and it overtakes MODI from around
+    1000x1000, but network simplex stays faster.
+
+    Prices stay integral, so all tests are exact. They are not duals of the
+    transportation problem itself (a cell can sit at its cap with any
+    reduced cost), so no u/v are exposed; lower_bound() builds a valid
+    bound from the column prices instead.
+    """
+
+    def __init__(self, trans, bfs=None, alpha=8, tol=1e-9):
+        if not isinstance(trans, Transportation):
+            raise TypeError("CostScaling needs a Transportation instance")
+        if bfs is not None:
+            raise ValueError("cost scaling starts from its own epsilon-optimal flows")
+        self.trans = trans
+        self.cost = trans.cost
+        self.scale = trans.scale
+        self.n, self.m = n, m = self.cost.shape
+        self.alpha = alpha
+        self.supply = trans.supply
+        self.demand = trans.demand
+
+        # prices can drift by a few N * max|C| per phase, keep them in int64
+        self.factor = n + m + 1
+        cost, scale = scale_to_int(self.cost, limit=2 ** 62 // (3 * self.factor ** 2))
+        self.C = cost * self.factor
+        # C = self.cost * cost_scale, prices are in the same units
+        self.cost_scale = scale * self.factor
+
+        dtype = np.result_type(self.supply, self.demand)
+        self.tol = 0 if np.issubdtype(dtype, np.integer) else tol
+        self.cap = np.minimum(self.supply[:, None], self.demand[None, :])
+        self.X = np.zeros((n, m), dtype=dtype)
+        self.p_row = np.zeros(n, dtype=np.int64)
+        self.p_col = np.zeros(m, dtype=np.int64)
+        self.stats = {"phases": 0, "sweeps": 0, "pushes": 0, "relabels": 0}
+
+    def _refine(self, eps):
+        X, tol = self.X, self.tol
+        R = self.C + self.p_row[:, None] - self.p_col[None, :]
+        np.copyto(X, self.cap, where=R < 0)
+        np.copyto(X, 0, where=R > 0)
+
+        self.row_excess = self.supply - X.sum(axis=1)
+        self.col_excess = X.sum(axis=0) - self.demand
+        while True:
+            rows = np.flatnonzero(self.row_excess > tol)
+            if rows.size:
+                self._discharge_rows(rows, eps)
+            cols = np.flatnonzero(self.col_excess > tol)
+            if cols.size:
+                self._discharge_cols(cols, eps)
+            self.stats["sweeps"] += 1
+            if not rows.size and not cols.size:
+                break
+
+    def _push(self, excess, resid, axis):
+        """Fill the residual capacities in order along axis until the excess runs out."""
+        before = np.cumsum(resid, axis=axis) - resid
+        return np.clip(excess - before, 0, resid)
+
+    def _discharge_rows(self, rows, eps):
+        # rows only touch columns, so all active rows can push and relabel at once
+        X, tol = self.X, self.tol
+        C, resid = self.C[rows], self.cap[rows] - X[rows]
+        R = C + self.p_row[rows, None] - self.p_col[None, :]
+        resid = np.where((R < 0) & (resid > tol), resid, 0)
+        amount = self._push(self.row_excess[rows, None], resid, axis=1)
+        X[rows] += amount
+        self.row_excess[rows] -= amount.sum(axis=1)
+        self.col_excess += amount.sum(axis=0)
+        self.stats["pushes"] += int((amount > 0).any(axis=1).sum())
+
+        stuck = self.row_excess[rows] > tol
+        if stuck.any():
+            rows, C = rows[stuck], C[stuck]
+            open_ = self.cap[rows] - X[rows] > tol
+            best = np.where(open_, self.p_col[None, :] - C, np.iinfo(np.int64).min)
+            self.p_row[rows] = best.max(axis=1) - eps
+            self.stats["relabels"] += len(rows)
+
+    def _discharge_cols(self, cols, eps):
+        X, tol = self.X, self.tol
+        C, flow = self.C[:, cols], X[:, cols]
+        R = self.p_col[None, cols] - C - self.p_row[:, None]
+        flow = np.where((R < 0) & (flow > tol), flow, 0)
+        amount = self._push(self.col_excess[None, cols], flow, axis=0)
+        X[:, cols] -= amount
+        self.row_excess += amount.sum(axis=1)
+        self.col_excess[cols] -= amount.sum(axis=0)
+        self.stats["pushes"] += int((amount > 0).any(axis=0).sum())
+
+        stuck = self.col_excess[cols] > tol
+        if stuck.any():
+            cols, C = cols[stuck], C[:, stuck]
+            open_ = X[:, cols] > tol
+            best = np.where(open_, self.p_row[:, None] + C, np.iinfo(np.int64).min)
+            self.p_col[cols] = best.max(axis=0) - eps
+            self.stats["relabels"] += len(cols)
+
+    def lower_bound(self):
+        """dual_bound() with v = p[column] brought back to the units of trans.cost."""
+        return dual_bound(self.cost, self.p_col / self.cost_scale, self.supply, self.demand, self.scale)
+
+    def solve(self, max_iter=None, time_limit=None):
+        """
+        Run the scaling phases down to epsilon = 1, or until a budget
+        (max_iter phases, time_limit seconds; checked between phases) runs
+        out; self.status tells which. Returns the positive flows as
+        {(i, j): value} and their cost.
+        """
+        began = time.perf_counter()
+        eps = max(1, int(np.abs(self.C).max(initial=0)))
+        self.status = "optimal"
+        while True:
+            eps = max(1, eps // self.alpha)
+            self._refine(eps)
+            self.stats["phases"] += 1
+            if eps == 1:
+                break
+            if max_iter is not None and self.stats["phases"] >= max_iter:
+                self.status = "iteration_limit"
+                break
+            if time_limit is not None and time.perf_counter() - began >= time_limit:
+                self.status = "time_limit"
+                break
+
+        rows, cols = np.nonzero(self.X > self.tol)
+        self.alloc = {(i, j): x for i, j, x in zip(rows.tolist(), cols.tolist(), self.X[rows, cols].tolist())}
+        return self.alloc, self.cost_value()
+
+    def cost_value(self):
+        return flow_cost(self.cost, self.alloc, self.scale)
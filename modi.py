@@ -1,126 +1,768 @@
+import time
 import numpy as np
+from collections import deque
+from transportation import Transportation, UnionFind, dual_bound, flow_cost, scale_to_int
+
+
+def _mix(k):
+    """splitmix64 finalizer, spreads cell indices for the basis hash."""
+    k = (k + 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+    k = ((k ^ (k >> 30)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+    k = ((k ^ (k >> 27)) * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+    return k ^ (k >> 31)
+
 
 class MODI:
-    def __init__(self, cost, bfs):
-        self.cost = np.array(cost, dtype=float)
+    """
+    Modified distribution (u-v) method on a spanning-tree basis.
+
+    pricing selects how the entering cell is found:
+      "dantzig"   - most positive u_i + v_j - cost_ij over all cells (maintained incrementally)
+      "first"     - first row, scanning on from the last one, with an improving cell; its best cell
+      "block"     - best cell of the next column block of block_size columns that has one
+      "candidate" - best of a list of the `candidates` most improving cells, rebuilt by a full
+                    pricing pass every `refresh` pivots or when it runs out
+    Iteration and time counters per run are kept in self.stats; solve() can be
+    budgeted and leaves the outcome in self.status, self.dual_bound and self.gap.
+    MODI.warm_start() continues from the basis_state() of an earlier run.
+
+    Reduced costs and flows within tol of zero count as zero. The starting
+    tree is strongly feasible (see _complete_basis) and the leaving cell is
+    the last blocking cell met when walking the loop from its apex in the
+    direction of the entering flow, which keeps it so (Cunningham), so
+    degenerate pivots cannot cycle. Should a basis still come back without
+    the cost moving (float ties), Bland's rule takes over until a pivot
+    moves flow again.
+
+    With integer=True costs are scaled to int64 (see scale_to_int), flows are
+    kept as Python ints and zero tests are exact (tol is ignored); potentials
+    stay in float64, which holds the integer sums exactly. cost_value() and
+    lower_bound() are reported in the original cost units. integer=None (the
+    default) turns it on for a Transportation whose cost, supply and demand
+    are all int64, e.g. after setup_table(integer=True).
+    """
+
+    PRICING = ("dantzig", "first", "block", "candidate")
+
+    def __init__(self, cost, bfs, pricing="dantzig", block_size=None, candidates=None, refresh=None,
+                 tol=1e-9, integer=None):
+        if pricing not in self.PRICING:
+            raise ValueError(f"unknown pricing strategy: {pricing!r}")
+        if isinstance(cost, Transportation):
+            # Use the typed core directly; labels (incl. "Dummy") map to indices
+            rows = {r: i for i, r in enumerate(cost.row_labels)}
+            cols = {c: j for j, c in enumerate(cost.col_labels)}
+            self.cost = cost.cost
+        else:
+            rows = cols = None
+            self.cost = np.array(cost, dtype=float)
         self.n, self.m = self.cost.shape
+
+        if integer is None:
+            integer = isinstance(cost, Transportation) and all(
+                np.issubdtype(a.dtype, np.integer) for a in (cost.cost, cost.supply, cost.demand))
+        self.integer = integer
+        self.scale = getattr(cost, "scale", 1)
+        if integer:
+            self.cost, scale = scale_to_int(self.cost, limit=2 ** 53 // (self.n + self.m))
+            self.scale *= scale
+            tol = 0
+        self._zero = 0 if integer else 0.0
         
         # We store the basis as a dictionary {(i, j): value}
         # Crucially, we keep cells in the basis even if their value is 0.0
+        # The same cells form a spanning tree, kept as row/column adjacency
         self.alloc = {}
+        self.basis = np.zeros((self.n, self.m), dtype=bool)
+        self.row_adj = [set() for _ in range(self.n)]
+        self.col_adj = [set() for _ in range(self.m)]
+        # positive flows go in as they are, zero cells are only a preference
+        # for spanning the tree (see _complete_basis)
+        zeros = []
         for r, c, v in bfs:
-            i = int(r[1:]) if isinstance(r, str) else int(r)
-            j = int(c[1:]) if isinstance(c, str) else int(c)
-            self.alloc[(i, j)] = float(v)
+            cell = (self._index(r, rows), self._index(c, cols))
+            v = self._quantity(v)
+            if v > tol:
+                self._add_cell(cell, v)
+            else:
+                zeros.append(cell)
+
+        # Row/column totals of the starting solution are the supply and demand
+        self.supply = np.zeros(self.n)
+        self.demand = np.zeros(self.m)
+        for (i, j), v in self.alloc.items():
+            self.supply[i] += v
+            self.demand[j] += v
+
+        self.live_rows = self.supply > 0
+        self.live_cols = self.demand > 0
+        self._complete_basis(zeros)
+        u, v = self._compute_uv()
+        self.u = np.array(u, dtype=float)
+        self.v = np.array(v, dtype=float)
+
+        # rows/columns without supply/demand never enter: pricing sees them at +inf
+        dead = ~self.live_rows[:, None] | ~self.live_cols[None, :]
+        self._pcost = np.where(dead, np.inf, self.cost) if dead.any() else self.cost
+
+        self.tol = tol
+        self._hash = 0
+        for i, j in self.alloc:
+            self._hash ^= _mix(i * self.m + j)
+        self._seen = set()
+        self._stalled = False
+
+        self.pricing = pricing
+        self._price = getattr(self, f"_price_{pricing}")
+        self.block_size = block_size or max(1, int(np.ceil(np.sqrt(self.m))))
+        self.candidates = candidates or self.n + self.m
+        self.refresh = refresh or max(1, int(np.sqrt(self.n + self.m)))
+        self._cursor = 0
+        self._candidate_list = None
+        self.stats = {"pricing": pricing, "iterations": 0, "degenerate": 0, "bland": 0,
+                      "pricing_time": 0.0, "pivot_time": 0.0}
+
+        if pricing in ("dantzig", "candidate"):
+            # reduced costs u_i + v_j - cost_ij with basic cells at -inf
+            self._reduced = np.empty((self.n, self.m))
+            self._price_all()
+        if pricing == "dantzig":
+            # best candidate of every row, kept current across pivots
+            self.row_arg = np.argmax(self._reduced, 1)
+            self.row_best = self._reduced[np.arange(self.n), self.row_arg]
+
+    @classmethod
+    def warm_start(cls, cost, basis, supply=None, demand=None, tol=1e-9, **kwargs):
+        """
+        Start from an earlier basis (a basis_state() dict, or just its cells)
+        on a possibly modified problem. Flows are recomputed on the basis tree
+        for the given supply/demand. If some come out negative while the old
+        tree is still dual feasible (only supply/demand changed), dual simplex
+        pivots swap those cells out (_dual_repair); failing that, a greedy
+        pass over the old basis cells and then the cheapest cells rebuilds a
+        feasible forest, which keeps as many of the old cells as it can before
+        the usual completion. Potentials are recomputed from the tree.
+
+        supply/demand given here win; otherwise a Transportation brings its
+        own, and only for a plain cost array are the totals stored in a
+        basis_state() dict used.
+        """
+        cells = basis["cells"] if isinstance(basis, dict) else basis
+        if isinstance(cost, Transportation):
+            supply = cost.supply if supply is None else supply
+            demand = cost.demand if demand is None else demand
+            values = cost.cost
+        else:
+            if isinstance(basis, dict):
+                supply = basis["supply"] if supply is None else supply
+                demand = basis["demand"] if demand is None else demand
+            values = np.asarray(cost, dtype=float)
+        if supply is None or demand is None:
+            raise ValueError("warm_start needs supply and demand for a plain cost array")
+        n, m = values.shape
+        supply = np.asarray(supply, dtype=float)
+        demand = np.asarray(demand, dtype=float)
+        cells = [(int(i), int(j)) for i, j in cells if i < n and j < m]
+
+        flows = cls._tree_flows(n, m, cells, supply, demand, tol)
+        if flows is None:
+            flows = cls._dual_repair(values, cells, supply, demand, tol)
+        if flows is None:
+            flows = cls._greedy_flows(values, cells, supply, demand, tol)
+        cls._check_flows(flows, supply, demand, tol)
+
+        # reattach old cells that do not close a loop, before the row-major completion
+        sets = UnionFind(n + m)
+        for i, j in flows:
+            sets.union(i, n + j)
+        for i, j in cells:
+            if sets.union(i, n + j):
+                flows[i, j] = 0.0
+
+        return cls(cost, [(i, j, x) for (i, j), x in flows.items()], tol=tol, **kwargs)
+
+    @staticmethod
+    def _tree_flows(n, m, cells, supply, demand, tol, signed=False):
+        """
+        Flows on a basis forest by leaf elimination: a leaf's only cell carries
+        all of the leaf's remaining supply/demand. None if any flow is negative
+        (unless signed) or a tree cannot be balanced.
+        """
+        adj = [set() for _ in range(n + m)]
+        for i, j in cells:
+            adj[i].add(n + j)
+            adj[n + j].add(i)
+        rest = np.concatenate([supply, demand])
+        leaves = deque(k for k in range(n + m) if len(adj[k]) == 1)
 
-        self._ensure_non_degenerate()
+        flows = {}
+        while leaves:
+            a = leaves.popleft()
+            if len(adj[a]) != 1:
+                continue
+            b = adj[a].pop()
+            adj[b].discard(a)
+            x = rest[a]
+            if x < -tol and not signed:
+                return None
+            flows[(a, b - n) if a < n else (b, a - n)] = float(x) if signed else max(float(x), 0.0)
+            rest[a] = 0.0
+            rest[b] -= x
+            if len(adj[b]) == 1:
+                leaves.append(b)
 
-    def _ensure_non_degenerate(self):
-        """Ensures exactly n + m - 1 cells are in the basis."""
-        required = self.n + self.m - 1
-        if len(self.alloc) == required:
+        if len(flows) < len(cells) or np.abs(rest).max() > tol:
+            return None
+        return flows
+
+    @classmethod
+    def _dual_repair(cls, cost, cells, supply, demand, tol):
+        """
+        Dual simplex on an old spanning tree whose potentials are still dual
+        feasible: the most negative flow leaves, and of the cells that raise
+        it (row on the far side of the cut, column on its side) the one with
+        the smallest reduced cost enters, which keeps the others nonnegative.
+        None if the cells are no spanning tree, are not dual feasible, or the
+        repair does not finish within n + m pivots.
+        """
+        n, m = cost.shape
+        cells = set(cells)
+        if len(cells) != n + m - 1:
+            return None
+        cost = np.asarray(cost, dtype=float)
+        adj = [set() for _ in range(n + m)]
+        for i, j in cells:
+            adj[i].add(n + j)
+            adj[n + j].add(i)
+
+        def reach(start, cut):
+            seen = np.zeros(n + m, dtype=bool)
+            seen[start] = True
+            stack = [start]
+            while stack:
+                a = stack.pop()
+                for b in adj[a]:
+                    if not seen[b] and {a, b} != cut:
+                        seen[b] = True
+                        stack.append(b)
+            return seen
+
+        # potentials from the tree, u[0] = 0
+        pot = np.zeros(n + m)
+        if not reach(0, None).all():
+            return None
+        stack, seen = [0], {0}
+        while stack:
+            a = stack.pop()
+            for b in adj[a]:
+                if b not in seen:
+                    i, j = (a, b - n) if a < n else (b, a - n)
+                    pot[b] = cost[i, j] - pot[a]
+                    seen.add(b)
+                    stack.append(b)
+        u, v = pot[:n], pot[n:]
+        if (cost - u[:, None] - v[None, :]).min() < -tol * max(1.0, np.abs(cost).max()):
+            return None
+
+        for _ in range(n + m):
+            flows = cls._tree_flows(n, m, cells, supply, demand, tol, signed=True)
+            if flows is None:
+                return None
+            (p, q), x = min(flows.items(), key=lambda item: item[1])
+            if x >= -tol:
+                return {cell: max(x, 0.0) for cell, x in flows.items()}
+
+            # rows across the cut from p, columns on p's side
+            side = reach(p, {p, n + q})
+            rows, cols = np.flatnonzero(~side[:n]), np.flatnonzero(side[n:])
+            if not (rows.size and cols.size):
+                return None
+            D = cost[np.ix_(rows, cols)] - u[rows, None] - v[None, cols]
+            r, c = divmod(int(np.argmin(D)), cols.size)
+            i, j = int(rows[r]), int(cols[c])
+            u[~side[:n]] += D[r, c]
+            v[~side[n:]] -= D[r, c]
+
+            cells.discard((p, q))
+            adj[p].discard(n + q)
+            adj[n + q].discard(p)
+            cells.add((i, j))
+            adj[i].add(n + j)
+            adj[n + j].add(i)
+        return None
+
+    @staticmethod
+    def _check_flows(flows, supply, demand, tol):
+        """Raise ValueError unless the flows meet supply and demand."""
+        rows, cols = np.zeros(len(supply)), np.zeros(len(demand))
+        for (i, j), x in flows.items():
+            rows[i] += x
+            cols[j] += x
+        bound = tol * max(1.0, float(supply.sum()))
+        if np.abs(rows - supply).max(initial=0) > bound or np.abs(cols - demand).max(initial=0) > bound:
+            raise ValueError("warm start flows do not meet the supply and demand "
+                             "(are they balanced?)")
+
+    @staticmethod
+    def _greedy_flows(cost, cells, supply, demand, tol):
+        """
+        Feasible forest: every allocation closes a row or column, so no loop
+        can form. Old basis cells go first, then the rest in cost order.
+        """
+        s, d = supply.copy(), demand.copy()
+        m = cost.shape[1]
+        flows = {}
+        order = [i * m + j for i, j in cells]
+        for k in order + list(np.argsort(cost, axis=None, kind="stable")):
+            i, j = divmod(int(k), m)
+            if s[i] > tol and d[j] > tol:
+                x = min(s[i], d[j])
+                flows[i, j] = float(x)
+                s[i] -= x
+                d[j] -= x
+                if not (s > tol).any():
+                    break
+        return flows
+
+    def basis_state(self):
+        """Basis cells, flows, potentials and totals, as taken by warm_start()."""
+        return {"cells": list(self.alloc), "alloc": dict(self.alloc),
+                "u": self.u.copy(), "v": self.v.copy(),
+                "supply": self.supply.copy(), "demand": self.demand.copy()}
+
+    def _quantity(self, v):
+        if not self.integer:
+            return float(v)
+        q = int(round(v))
+        if q != v:
+            raise ValueError(f"integer mode needs integral flows, got {v}")
+        return q
+
+    @staticmethod
+    def _index(label, labels):
+        if labels is not None and label in labels:
+            return labels[label]
+        return int(label[1:]) if isinstance(label, str) else int(label)
+
+    def _add_cell(self, cell, value):
+        i, j = cell
+        self.alloc[cell] = value
+        self.basis[cell] = True
+        self.row_adj[i].add(j)
+        self.col_adj[j].add(i)
+
+    def _drop_cell(self, cell):
+        i, j = cell
+        del self.alloc[cell]
+        self.basis[cell] = False
+        self.row_adj[i].discard(j)
+        self.col_adj[j].discard(i)
+
+    def _complete_basis(self, preferred=()):
+        """
+        Spans the flows with zero cells into a strongly feasible tree: rooted
+        at the first row with supply, every zero cell between live rows and
+        columns hangs its row below its column, so a positive amount can be
+        sent from any live node to the root. Cells from `preferred` are used
+        where they fit, otherwise the cheapest cell into the tree. Rows and
+        columns without supply/demand cannot be placed that way (all their
+        cells are zero); they hang as leaves off the cheapest live cell and
+        stay out of every loop because they never enter.
+        """
+        n, m, cost = self.n, self.m, self.cost
+        rows, cols = np.flatnonzero(self.live_rows), np.flatnonzero(self.live_cols)
+        self.root = int(rows[0]) if rows.size else 0
+        if not rows.size:
+            for i in range(n):
+                self._add_cell((i, 0), self._zero)
+            for j in range(1, m):
+                self._add_cell((0, j), self._zero)
             return
 
-        for i in range(self.n):
-            for j in range(self.m):
-                if (i, j) not in self.alloc:
-                    # Logic check: Adding this 0-cell must not create a loop
-                    if not self._find_loop((i, j)):
-                        self.alloc[(i, j)] = 0.0
-                        if len(self.alloc) == required:
-                            return
+        # live parts of the flow forest, the root's part is the tree so far
+        sets = UnionFind(n + m)
+        for i, j in self.alloc:
+            sets.union(i, n + j)
+        parts = {}
+        for k in rows.tolist() + (n + cols).tolist():
+            parts.setdefault(sets.find(k), []).append(k)
+        in_tree = np.zeros(n + m, dtype=bool)
+        in_tree[parts.pop(sets.find(self.root))] = True
+
+        def attach(i, j):
+            self._add_cell((i, j), self._zero)
+            in_tree[parts.pop(sets.find(i))] = True
+
+        preferred = [(i, j) for i, j in preferred if self.live_rows[i] and self.live_cols[j]]
+        grown = True
+        while grown and parts:
+            grown = False
+            for i, j in preferred:
+                if in_tree[n + j] and not in_tree[i]:
+                    attach(i, j)
+                    grown = True
+        for key in list(parts):
+            if key not in parts:
+                continue
+            part_rows = [k for k in parts[key] if k < n]
+            tree_cols = cols[in_tree[n + cols]]
+            sub = cost[np.ix_(part_rows, tree_cols)]
+            r, c = divmod(int(np.argmin(sub)), len(tree_cols))
+            attach(part_rows[r], int(tree_cols[c]))
+
+        for i in np.flatnonzero(~self.live_rows).tolist():
+            self._add_cell((i, int(cols[np.argmin(cost[i, cols])])), self._zero)
+        for j in np.flatnonzero(~self.live_cols).tolist():
+            self._add_cell((int(rows[np.argmin(cost[rows, j])]), j), self._zero)
+
+    def _settle_dead(self):
+        """
+        Potentials of the rows/columns without supply/demand by a c-transform
+        against the live ones, so that no reduced cost is positive; each is
+        rehung on the cell that attains it.
+        """
+        dead_rows = np.flatnonzero(~self.live_rows)
+        dead_cols = np.flatnonzero(~self.live_cols)
+        rows, cols = np.flatnonzero(self.live_rows), np.flatnonzero(self.live_cols)
+        if not (dead_rows.size or dead_cols.size) or not rows.size:
+            return
+        for i in dead_rows.tolist():
+            for j in list(self.row_adj[i]):
+                self._drop_cell((i, j))
+        for j in dead_cols.tolist():
+            for i in list(self.col_adj[j]):
+                self._drop_cell((i, j))
+
+        u, v = self.u, self.v
+        if dead_rows.size:
+            R = self.cost[np.ix_(dead_rows, cols)] - v[None, cols]
+            best = cols[R.argmin(axis=1)]
+            u[dead_rows] = R.min(axis=1)
+            for i, j in zip(dead_rows.tolist(), best.tolist()):
+                self._add_cell((i, j), self._zero)
+        if dead_cols.size:
+            R = self.cost[:, dead_cols] - u[:, None]
+            best = R.argmin(axis=0)
+            v[dead_cols] = R.min(axis=0)
+            for i, j in zip(best.tolist(), dead_cols.tolist()):
+                self._add_cell((i, j), self._zero)
+
+        u, v = self._compute_uv()
+        self.u = np.array(u, dtype=float)
+        self.v = np.array(v, dtype=float)
+        self._candidate_list = None
+        if self.pricing in ("dantzig", "candidate"):
+            self._price_all()
+        if self.pricing == "dantzig":
+            self.row_arg = np.argmax(self._reduced, 1)
+            self.row_best = self._reduced[np.arange(self.n), self.row_arg]
 
     def _compute_uv(self):
+        """
+        Potentials u_i + v_j = cost_ij by one BFS over the basis tree.
+        Also records the BFS tree (nodes are rows 0..n-1, then columns).
+        """
         u = [None] * self.n
         v = [None] * self.m
-        u[0] = 0.0
-        
-        # Solving u_i + v_j = cost_ij for basic cells
-        while None in u or None in v:
-            changed = False
-            for (i, j) in self.alloc.keys():
-                if u[i] is not None and v[j] is None:
-                    v[j] = self.cost[i, j] - u[i]
-                    changed = True
-                elif v[j] is not None and u[i] is None:
-                    u[i] = self.cost[i, j] - v[j]
-                    changed = True
-            if not changed: break # Should not happen if non-degenerate
+        self.parent = [-1] * (self.n + self.m)
+        self.depth = [0] * (self.n + self.m)
+
+        for root in [getattr(self, "root", 0)] + list(range(self.n)):
+            if u[root] is not None:
+                continue
+            u[root] = 0.0
+            queue = deque([root])
+            while queue:
+                k = queue.popleft()
+                if k < self.n:
+                    for j in self.row_adj[k]:
+                        if v[j] is None:
+                            v[j] = self.cost[k, j] - u[k]
+                            self._set_parent(self.n + j, k)
+                            queue.append(self.n + j)
+                else:
+                    for i in self.col_adj[k - self.n]:
+                        if u[i] is None:
+                            u[i] = self.cost[i, k - self.n] - v[k - self.n]
+                            self._set_parent(i, k)
+                            queue.append(i)
         return u, v
 
+    def _set_parent(self, node, parent):
+        self.parent[node] = parent
+        self.depth[node] = self.depth[parent] + 1
+
+    def _cell(self, a, b):
+        """Basic cell joining two adjacent tree nodes."""
+        return (a, b - self.n) if a < self.n else (b, a - self.n)
+
     def _find_loop(self, start_cell):
-        """Finds a closed loop for the entering cell using a simplified path search."""
-        basis = list(self.alloc.keys()) + [start_cell]
-        
-        def get_path(curr, path, search_row):
-            if len(path) > 3 and curr == start_cell:
-                return path[:-1]
-            
-            i, j = curr
-            if search_row:
-                # Look for cells in the same row
-                candidates = [c for c in basis if c[0] == i and c != curr]
-            else:
-                # Look for cells in the same column
-                candidates = [c for c in basis if c[1] == j and c != curr]
-            
-            for next_cell in candidates:
-                if next_cell not in path or (next_cell == start_cell and len(path) > 2):
-                    res = get_path(next_cell, path + [next_cell], not search_row)
-                    if res: return res
-            return None
+        """
+        Closed loop for the entering cell: the cell itself followed by the
+        unique tree path from its row to its column, and the loop position
+        of the first cell past the apex (the common ancestor); (None, None)
+        if the two are not connected. Even positions gain theta, odd
+        positions lose it.
+        """
+        parent, depth = self.parent, self.depth
+        a, b = start_cell[0], self.n + start_cell[1]
+        up_a, up_b = [a], [b]
 
-        return get_path(start_cell, [start_cell], True)
+        while depth[a] > depth[b]:
+            a = parent[a]
+            up_a.append(a)
+        while depth[b] > depth[a]:
+            b = parent[b]
+            up_b.append(b)
+        while a != b:
+            a, b = parent[a], parent[b]
+            up_a.append(a)
+            up_b.append(b)
+        if a < 0:
+            return None, None
 
-    def _reallocate(self, loop):
+        path = up_a + up_b[-2::-1]
+        return [start_cell] + [self._cell(x, y) for x, y in zip(path, path[1:])], len(up_a)
+
+    def _reallocate(self, loop, apex, bland=False):
         # Even indices: start_cell, then every 2nd (the + cells)
         # Odd indices: the cells we subtract from (the - cells)
-        minus_cells = loop[1::2]
-        theta = min(self.alloc[c] for c in minus_cells)
+        minus = range(1, len(loop), 2)
+        theta = min(self.alloc[loop[k]] for k in minus)
+        blocking = [k for k in minus if self.alloc[loop[k]] - theta <= self.tol]
+
+        # Remove EXACTLY ONE cell from the basis to maintain m+n-1.
+        # Walking from the apex along the entering flow, the cells past the
+        # apex come last (nearest the apex last of all); take the last one.
+        if bland:
+            leave = min(blocking, key=lambda k: loop[k])
+        else:
+            past = [k for k in blocking if k >= apex]
+            leave = min(past) if past else min(blocking)
 
-        # Update values
+        # Update values, flows within tol of zero become exact zeros
         for idx, cell in enumerate(loop):
             if idx % 2 == 0:
-                self.alloc[cell] = self.alloc.get(cell, 0) + theta
+                self._add_cell(cell, self.alloc.get(cell, 0) + theta)
             else:
-                self.alloc[cell] -= theta
-
-        # Remove EXACTLY ONE cell from the basis to maintain m+n-1
-        # Even if multiple cells hit zero, we only drop the first one found.
-        dropped = False
-        for cell in minus_cells:
-            if self.alloc[cell] == 0 and not dropped:
-                del self.alloc[cell]
-                dropped = True
-
-    def solve(self):
-        for _ in range(100): # Safety limit
-            u, v = self._compute_uv()
-            
-            # Find the cell with the most negative opportunity cost (entering cell)
-            min_reduced_cost = 0
-            entering_cell = None
-            
-            for i in range(self.n):
-                for j in range(self.m):
-                    if (i, j) not in self.alloc:
-                        # P_ij = u_i + v_j - cost_ij
-                        # Optimization: we look for u_i + v_j > cost_ij
-                        penalty = u[i] + v[j] - self.cost[i, j]
-                        if penalty > min_reduced_cost:
-                            min_reduced_cost = penalty
-                            entering_cell = (i, j)
+                value = self.alloc[cell] - theta
+                self.alloc[cell] = self._zero if abs(value) <= self.tol else value
 
-            if entering_cell is None:
-                break # Optimal solution reached
+        self._drop_cell(loop[leave])
+        return loop[leave], theta
 
-            loop = self._find_loop(entering_cell)
-            if loop:
-                self._reallocate(loop)
+    def _subtree(self, start, skip):
+        """Tree nodes reachable from start without using the basic cell skip."""
+        n = self.n
+        seen = {start}
+        stack = [start]
+        nodes = []
+        while stack:
+            k = stack.pop()
+            nodes.append(k)
+            if k < n:
+                nbrs = [n + j for j in self.row_adj[k] if (k, j) != skip]
             else:
+                nbrs = [i for i in self.col_adj[k - n] if (i, k - n) != skip]
+            for x in nbrs:
+                if x not in seen:
+                    seen.add(x)
+                    stack.append(x)
+        return nodes, seen
+
+    def _update_tree(self, entering, leaving):
+        """
+        After a pivot, re-hangs the subtree cut off by the leaving cell below
+        the entering cell and shifts the potentials of that subtree only.
+        """
+        n = self.n
+        p, q = leaving
+        i, j = entering
+        child = p if self.parent[p] == n + q else n + q
+        nodes, inside = self._subtree(child, entering)
+
+        # every potential in the subtree moves by the same constant
+        delta = self.cost[i, j] - self.u[i] - self.v[j]
+        if i in inside:
+            root, hang, du = i, n + j, delta
+        else:
+            root, hang, du = n + j, i, -delta
+        rows = [k for k in nodes if k < n]
+        cols = [k - n for k in nodes if k >= n]
+        self.u[rows] += du
+        self.v[cols] -= du
+
+        # re-root the subtree at the entering cell's endpoint
+        self._set_parent(root, hang)
+        queue = deque([root])
+        while queue:
+            k = queue.popleft()
+            nbrs = [n + y for y in self.row_adj[k]] if k < n else list(self.col_adj[k - n])
+            for x in nbrs:
+                if x in inside and x != self.parent[k]:
+                    self._set_parent(x, k)
+                    queue.append(x)
+        return rows, cols, du
+
+    def _update_reduced(self, entering, leaving, rows, cols, du):
+        """Refreshes reduced costs and row candidates touched by the last pivot."""
+        R = self._reduced
+        R[rows] += du
+        R[:, cols] -= du
+        R[entering] = -np.inf
+        p, q = leaving
+        R[p, q] = self.u[p] + self.v[q] - self._pcost[p, q]
+
+        # rows whose best candidate may have moved
+        stale = np.zeros(self.n, dtype=bool)
+        stale[rows] = True
+        stale[[entering[0], p]] = True
+        if cols:
+            stale |= np.isin(self.row_arg, cols)
+            if du < 0:
+                stale |= R[:, cols].max(1) >= self.row_best
+
+        stale = np.flatnonzero(stale)
+        self.row_arg[stale] = np.argmax(R[stale], 1)
+        self.row_best[stale] = R[stale, self.row_arg[stale]]
+
+    def _price_all(self):
+        R = self._reduced
+        np.add(self.u[:, None], self.v[None, :], out=R)
+        R -= self._pcost
+        R[self.basis] = -np.inf
+        return R
+
+    def _price_dantzig(self):
+        i = int(np.argmax(self.row_best))
+        if not self.row_best[i] > self.tol:
+            return None
+        return i, int(self.row_arg[i])
+
+    def _price_first(self):
+        for step in range(self.n):
+            i = (self._cursor + step) % self.n
+            r = self.u[i] + self.v - self._pcost[i]
+            r[self.basis[i]] = -np.inf
+            j = int(np.argmax(r))
+            if r[j] > self.tol:
+                self._cursor = i
+                return i, j
+        return None
+
+    def _price_block(self):
+        size = self.block_size
+        blocks = -(-self.m // size)
+        for step in range(blocks):
+            b = (self._cursor + step) % blocks
+            cols = slice(b * size, min(self.m, (b + 1) * size))
+            R = self.u[:, None] + self.v[None, cols] - self._pcost[:, cols]
+            R[self.basis[:, cols]] = -np.inf
+            k = int(np.argmax(R))
+            if R.flat[k] > self.tol:
+                self._cursor = (b + 1) % blocks
+                i, j = divmod(k, R.shape[1])
+                return i, cols.start + j
+        return None
+
+    def _price_candidate(self):
+        if self._candidate_list is not None and self._cursor < self.refresh:
+            rows, cols = self._candidate_list
+            r = self.u[rows] + self.v[cols] - self._pcost[rows, cols]
+            r[self.basis[rows, cols]] = -np.inf
+            k = int(np.argmax(r))
+            if r[k] > self.tol:
+                self._cursor += 1
+                return int(rows[k]), int(cols[k])
+
+        # full pricing pass, keeping the most improving cells as candidates
+        R = self._price_all().ravel()
+        improving = np.flatnonzero(R > self.tol)
+        if not len(improving):
+            return None
+        if len(improving) > self.candidates:
+            top = np.argpartition(R[improving], -self.candidates)[-self.candidates:]
+            improving = improving[top]
+        self._candidate_list = np.divmod(improving, self.m)
+        self._cursor = 0
+        return self._price_candidate()
+
+    def _price_bland(self):
+        """Lowest-index improving cell (row-major), by one masked flat argmax."""
+        improving = self.u[:, None] + self.v[None, :] - self._pcost > self.tol
+        improving &= ~self.basis
+        k = int(np.argmax(improving))
+        return divmod(k, self.m) if improving.flat[k] else None
+
+    def lower_bound(self):
+        """Dual bound on the optimal cost from the current column potentials."""
+        return dual_bound(self.cost, self.v, self.supply, self.demand, self.scale)
+
+    def _measure_gap(self):
+        primal = self.cost_value()
+        self.dual_bound = self.lower_bound()
+        self.gap = max(0.0, (primal - self.dual_bound) / max(1.0, abs(primal)))
+        return self.gap
+
+    def solve(self, max_iter=None, time_limit=None, gap_tolerance=None):
+        """
+        Pivot until optimal or until a budget runs out: max_iter pivots,
+        time_limit seconds, or a relative gap between the current cost and
+        the dual bound of at most gap_tolerance (checked every `refresh`
+        pivots). self.status is "optimal", "iteration_limit", "time_limit"
+        or "gap_limit"; the current (feasible) solution is returned either way.
+        """
+        stats = self.stats
+        began = time.perf_counter()
+        pivots = 0
+        while True:
+            if max_iter is not None and pivots >= max_iter:
+                self.status = "iteration_limit"
                 break
-        
+            if time_limit is not None and time.perf_counter() - began >= time_limit:
+                self.status = "time_limit"
+                break
+            if (gap_tolerance is not None and pivots % self.refresh == 0
+                    and self._measure_gap() <= gap_tolerance):
+                self.status = "gap_limit"
+                break
+
+            # Find an entering cell with positive u_i + v_j - cost_ij
+            bland = self._stalled
+            start = time.perf_counter()
+            entering_cell = self._price_bland() if bland else self._price()
+            stats["pricing_time"] += time.perf_counter() - start
+            if entering_cell is None:
+                self.status = "optimal"
+                break
+
+            start = time.perf_counter()
+            loop, apex = self._find_loop(entering_cell)
+            leaving_cell, theta = self._reallocate(loop, apex, bland)
+            changed = self._update_tree(entering_cell, leaving_cell)
+            stats["pivot_time"] += time.perf_counter() - start
+            stats["iterations"] += 1
+            stats["bland"] += bland
+            pivots += 1
+            # a basis seen again since the cost last moved means stalling
+            self._hash ^= _mix(entering_cell[0] * self.m + entering_cell[1])
+            self._hash ^= _mix(leaving_cell[0] * self.m + leaving_cell[1])
+            if theta <= self.tol:
+                stats["degenerate"] += 1
+                self._stalled = self._stalled or self._hash in self._seen
+                self._seen.add(self._hash)
+            else:
+                self._seen.clear()
+                self._stalled = False
+
+            if self.pricing == "dantzig":
+                start = time.perf_counter()
+                self._update_reduced(entering_cell, leaving_cell, *changed)
+                stats["pricing_time"] += time.perf_counter() - start
+
+        self._settle_dead()
+        self._measure_gap()
         return self.alloc, self.cost_value()
 
     def cost_value(self):
-        return sum(self.cost[i, j] * v for (i, j), v in self.alloc.items())
\ No newline at end of file
+        return flow_cost(self.cost, self.alloc, self.scale)
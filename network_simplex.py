@@ -0,0 +1,298 @@
+import time
+import numpy as np
+from transportation import Transportation, UnionFind, dual_bound, flow_cost
+
+UP, DOWN = 1, -1
+
+
+class NetworkSimplex:
+    """
+    Primal network simplex on the bipartite transportation network.
+
+    Nodes are the rows 0..n-1, the columns n..n+m-1 and an artificial root
+    n+m. Arc i*m + j carries flow from row i to column j; arc n*m + k is the
+    artificial arc between node k and the root. The basis is a spanning tree
+    rooted at the root and stored per node in plain arrays:
+      parent, pred (arc to the parent), dir (UP if pred points to the parent,
+      DOWN if it points away from it), flow (on pred), depth, and the thread
+      (preorder successor) with its reverse, so a subtree is the run of the
+      thread that starts at its root and stays below its depth.
+
+    Without an IBFS the crash basis is all artificial arcs at cost big_m.
+    With one (VAM/RAM output) its positive-flow forest is hung from the root
+    by zero-flow artificial arcs. Both are strongly feasible trees, and
+    Cunningham's leaving rule keeps them so. Entering arcs come from
+    vectorized block pricing over block_size arcs (whole rows) at a time.
+    Potentials pi satisfy cost + pi[tail] - pi[head] = 0 on tree arcs; in MODI
+    terms u = -pi[rows] and v = pi[columns].
+    """
+
+    def __init__(self, trans, bfs=None, block_size=None, tol=1e-9):
+        if not isinstance(trans, Transportation):
+            raise TypeError("NetworkSimplex needs a Transportation instance")
+        self.trans = trans
+        self.cost = trans.cost
+        self.scale = trans.scale
+        self.n, self.m = n, m = self.cost.shape
+        self.root = root = n + m
+        self.tol = tol
+        self.supply = trans.supply
+        self.demand = trans.demand
+        self.big_m = (float(np.abs(self.cost).max(initial=0)) + 1) * (n + m)
+
+        self.block_size = block_size or max(1, int(np.ceil(np.sqrt(n * m))))
+        self._block_rows = max(1, -(-self.block_size // m))
+        self._cursor = 0
+        self.basis = np.zeros((n, m), dtype=bool)
+        self.stats = {"iterations": 0, "degenerate": 0, "pricing_time": 0.0, "pivot_time": 0.0}
+
+        if bfs is None:
+            adj, flows, tails = self._crash_tree()
+        else:
+            adj, flows, tails = self._forest_tree(bfs)
+        self._build(adj, flows, tails)
+
+    def _crash_tree(self):
+        n, m, root = self.n, self.m, self.root
+        nm = n * m
+        adj = [[] for _ in range(n + m + 1)]
+        flows, tails = {}, {}
+        for k, q in enumerate(self.supply.tolist() + self.demand.tolist()):
+            a = nm + k
+            adj[root].append((k, a))
+            flows[a] = q
+            # positive supply flows up to the root, everything else flows down
+            tails[a] = k if k < n and q > 0 else root
+        return adj, flows, tails
+
+    def _forest_tree(self, bfs):
+        n, m, root = self.n, self.m, self.root
+        nm = n * m
+        rows = {r: i for i, r in enumerate(self.trans.row_labels)}
+        cols = {c: j for j, c in enumerate(self.trans.col_labels)}
+        adj = [[] for _ in range(n + m + 1)]
+        flows, tails = {}, {}
+
+        sets = UnionFind(n + m)
+        for r, c, v in bfs:
+            if not v > self.tol:
+                continue
+            i = rows[r] if r in rows else int(r)
+            j = cols[c] if c in cols else int(c)
+            if not sets.union(i, n + j):
+                raise ValueError("the IBFS flows do not form a forest")
+            arc = i * m + j
+            adj[i].append((n + j, arc))
+            adj[n + j].append((i, arc))
+            flows[arc] = v
+
+        # one zero-flow arc from the root into every tree of the forest
+        for k in range(n + m):
+            if sets.find(k) == k:
+                a = nm + k
+                adj[root].append((k, a))
+                flows[a] = 0
+                tails[a] = root
+        return adj, flows, tails
+
+    def _build(self, adj, flows, tails):
+        N, nm, m, root = self.n + self.m + 1, self.n * self.m, self.m, self.root
+        self.parent = parent = [-1] * N
+        self.pred = pred = [-1] * N
+        self.dir = dirs = [0] * N
+        self.flow = flow = [0] * N
+        self.depth = depth = [0] * N
+        pi = [0.0] * N
+
+        order, stack = [], [root]
+        while stack:
+            x = stack.pop()
+            order.append(x)
+            for y, a in adj[x]:
+                if y == parent[x]:
+                    continue
+                parent[y], pred[y], depth[y], flow[y] = x, a, depth[x] + 1, flows[a]
+                if a < nm:
+                    tail, c = a // m, float(self.cost[a // m, a % m])
+                    self.basis[a // m, a % m] = True
+                else:
+                    tail, c = tails[a], self.big_m
+                if tail == y:
+                    dirs[y], pi[y] = UP, pi[x] - c
+                else:
+                    dirs[y], pi[y] = DOWN, pi[x] + c
+                stack.append(y)
+
+        # the thread is circular and closes at the root
+        self.thread = thread = [0] * N
+        self.rev_thread = rev = [0] * N
+        for x, y in zip(order, order[1:] + order[:1]):
+            thread[x] = y
+            rev[y] = x
+        self.pi = np.array(pi)
+
+    @property
+    def u(self):
+        return -self.pi[:self.n]
+
+    @property
+    def v(self):
+        return self.pi[self.n:self.n + self.m]
+
+    def _price(self):
+        """Most negative reduced cost in the next block of rows that has one."""
+        n, size = self.n, self._block_rows
+        pi_row, pi_col = self.pi[:n], self.pi[n:n + self.m]
+        blocks = -(-n // size)
+        for step in range(blocks):
+            b = (self._cursor + step) % blocks
+            rows = slice(b * size, min(n, (b + 1) * size))
+            R = self.cost[rows] + pi_row[rows, None] - pi_col[None, :]
+            R[self.basis[rows]] = 0
+            k = int(np.argmin(R))
+            if R.flat[k] < -self.tol:
+                self._cursor = (b + 1) % blocks
+                i, j = divmod(k, self.m)
+                return rows.start + i, j, float(R.flat[k])
+        return None
+
+    def _pivot(self, i, j, rc):
+        parent, depth, flow, dirs = self.parent, self.depth, self.flow, self.dir
+        first, second = i, self.n + j
+
+        # apex of the cycle closed by first -> second
+        a, b = first, second
+        while a != b:
+            if depth[a] >= depth[b]:
+                a = parent[a]
+            else:
+                b = parent[b]
+        apex = a
+
+        # Cunningham: walking the cycle from the apex along the entering arc,
+        # the last blocking arc leaves. On the first side flow is pushed down
+        # towards first (ties go to the arc nearest first), on the second side
+        # up from second (ties go to the arc nearest the apex, and win).
+        delta, leave, on_second = float("inf"), -1, False
+        x = first
+        while x != apex:
+            if dirs[x] == UP and flow[x] < delta:
+                delta, leave = flow[x], x
+            x = parent[x]
+        x = second
+        while x != apex:
+            if dirs[x] == DOWN and flow[x] <= delta:
+                delta, leave, on_second = flow[x], x, True
+            x = parent[x]
+        if leave < 0:
+            raise ValueError("unbounded cycle, the problem has no optimum")
+
+        if delta:
+            for x, sign in ((first, -1), (second, 1)):
+                while x != apex:
+                    value = flow[x] + sign * dirs[x] * delta
+                    flow[x] = value if abs(value) > self.tol else 0
+                    x = parent[x]
+        else:
+            self.stats["degenerate"] += 1
+
+        leaving = self.pred[leave]
+        if leaving < self.n * self.m:
+            self.basis[divmod(leaving, self.m)] = False
+        self.basis[i, j] = True
+
+        if on_second:
+            self._move_subtree(leave, second, first, i * self.m + j, DOWN, delta, rc)
+        else:
+            self._move_subtree(leave, first, second, i * self.m + j, UP, delta, -rc)
+
+    def _move_subtree(self, top, q, p, arc, direction, delta, shift):
+        """
+        Cut the subtree under `top`, re-root it at q and hang it below p by
+        the entering arc. O(size of the subtree): thread, depths and
+        potentials of the moved nodes are rewritten, nothing else.
+        """
+        parent, pred, dirs, flow, depth = self.parent, self.pred, self.dir, self.flow, self.depth
+        thread, rev = self.thread, self.rev_thread
+
+        nodes = [top]
+        y = thread[top]
+        while depth[y] > depth[top]:
+            nodes.append(y)
+            y = thread[y]
+        before = rev[top]
+        thread[before] = y
+        rev[y] = before
+
+        # reverse the tree arcs on the path q .. top
+        path = [q]
+        while path[-1] != top:
+            path.append(parent[path[-1]])
+        for t in range(len(path) - 1, 0, -1):
+            y, z = path[t], path[t - 1]
+            parent[y], pred[y], dirs[y], flow[y] = z, pred[z], -dirs[z], flow[z]
+        parent[q], pred[q], dirs[q], flow[q] = p, arc, direction, delta
+
+        children = {x: [] for x in nodes}
+        for x in nodes:
+            if x != q:
+                children[parent[x]].append(x)
+
+        # new preorder of the subtree, spliced into the thread right after p
+        last, stack = p, [q]
+        after = thread[p]
+        while stack:
+            x = stack.pop()
+            depth[x] = depth[parent[x]] + 1
+            thread[last] = x
+            rev[x] = last
+            last = x
+            stack.extend(children[x])
+        thread[last] = after
+        rev[after] = last
+
+        self.pi[nodes] += shift
+
+    def lower_bound(self):
+        """dual_bound() with v = pi of the column nodes."""
+        return dual_bound(self.cost, self.v, self.supply, self.demand, self.scale)
+
+    def solve(self, max_iter=None, time_limit=None):
+        """
+        Pivot until no arc prices out or a budget (max_iter pivots,
+        time_limit seconds) runs out; self.status tells which. Returns the
+        transportation flows on the tree as {(i, j): value} and their cost.
+        """
+        stats = self.stats
+        began = time.perf_counter()
+        pivots = 0
+        while True:
+            if max_iter is not None and pivots >= max_iter:
+                self.status = "iteration_limit"
+                break
+            if time_limit is not None and time.perf_counter() - began >= time_limit:
+                self.status = "time_limit"
+                break
+
+            start = time.perf_counter()
+            entering = self._price()
+            stats["pricing_time"] += time.perf_counter() - start
+            if entering is None:
+                self.status = "optimal"
+                break
+
+            start = time.perf_counter()
+            self._pivot(*entering)
+            stats["pivot_time"] += time.perf_counter() - start
+            stats["iterations"] += 1
+            pivots += 1
+
+        nm, m = self.n * self.m, self.m
+        self.alloc = {divmod(a, m): self.flow[x] for x, a in enumerate(self.pred) if 0 <= a < nm}
+        if self.status == "optimal" and any(
+                self.flow[x] > self.tol for x, a in enumerate(self.pred) if a >= nm):
+            self.status = "infeasible"
+        return self.alloc, self.cost_value()
+
+    def cost_value(self):
+        return flow_cost(self.cost, self.alloc, self.scale)
@@ -16,52 +16,106 @@ class RussellsApproximationMethod:
 
     def __init__(self, trans):
         self.trans = trans
-        self.table = trans.table.copy()
+        # the cost matrix is only read; satisfied rows/columns are masked out
+        self.cost = trans.cost
+        self.supply = trans.supply.copy()
+        self.demand = trans.demand.copy()
+        n, m = self.cost.shape
+        self.row_active = np.ones(n, dtype=bool)
+        self.col_active = np.ones(m, dtype=bool)
         self.alloc = []
 
+        # U and V come from presorted orders with a pointer to the largest
+        # active cell; removed rows/columns get -inf so their Δ is +inf
+        self.row_order, self.col_order = trans.orders()
+        self.row_top = np.full(n, m - 1, dtype=np.intp)
+        self.col_top = np.full(m, n - 1, dtype=np.intp)
+        self.U = np.max(self.cost, 1).astype(np.float64)
+        self.V = np.max(self.cost, 0).astype(np.float64)
+
+        # most negative Δ of every row and where it is, refreshed per row
+        self.best = np.empty(n)
+        self.best_col = np.empty(n, dtype=np.intp)
+        self._refresh(np.arange(n))
+
+    def _refresh(self, rows):
+        delta = self.cost[rows] - self.U[rows, None] - self.V[None, :]
+        self.best_col[rows] = np.argmin(delta, 1)
+        self.best[rows] = delta[np.arange(len(rows)), self.best_col[rows]]
+
+    @staticmethod
+    def _lower(order, top, lines_active, cells_active, removed, values, cost):
+        """Moves the max pointer of lines whose largest cell was removed, returns them."""
+        lines = np.flatnonzero(lines_active)
+        lines = lines[order[lines, top[lines]] == removed]
+        for i in lines:
+            row = order[i]
+            p = top[i]
+            while p >= 0 and not cells_active[row[p]]:
+                p -= 1
+            top[i] = p
+            values[i] = cost[i, row[p]] if p >= 0 else -np.inf
+        return lines
+
     def allocate(self, x, y):
-        mins = min([self.table[x, -1], self.table[-1, y]])
-        self.alloc.append([self.table[x, 0], self.table[0, y], mins])
+        mins = min(self.supply[x], self.demand[y])
+        self.alloc.append([self.trans.row_labels[x], self.trans.col_labels[y], mins.item()])
 
-        if self.table[x, -1] < self.table[-1, y]:
-            self.table = np.delete(self.table, x, 0)
-            self.table[-1, y] -= mins
+        if self.supply[x] < self.demand[y]:
+            self._remove_row(x)
+            self.demand[y] -= mins
 
-        elif self.table[x, -1] > self.table[-1, y]:
-            self.table = np.delete(self.table, y, 1)
-            self.table[x, -1] -= mins
+        elif self.supply[x] > self.demand[y]:
+            self._remove_col(y)
+            self.supply[x] -= mins
 
         else:
-            self.table = np.delete(self.table, x, 0)
-            self.table = np.delete(self.table, y, 1)
+            self._remove_row(x)
+            self._remove_col(y)
+
+    def _remove_row(self, x):
+        self.row_active[x] = False
+        self.U[x] = -np.inf
+        self.best[x] = np.inf
+        # column maxima that sat in row x drop, so Δ rises in those columns;
+        # only rows whose best cell is in such a column need a refresh
+        cols = self._lower(self.col_order, self.col_top, self.col_active,
+                           self.row_active, x, self.V, self.cost.T)
+        rows = np.flatnonzero(self.row_active & np.isin(self.best_col, cols))
+        self._refresh(rows)
+
+    def _remove_col(self, y):
+        self.col_active[y] = False
+        self.V[y] = -np.inf
+        # rows whose maximum sat in column y, or whose best cell was there
+        rows = self._lower(self.row_order, self.row_top, self.row_active,
+                           self.col_active, y, self.U, self.cost)
+        hit = np.flatnonzero(self.row_active & (self.best_col == y))
+        self._refresh(np.union1d(rows, hit))
 
     def solve(self, show_iter=False):
 
-        while self.table.shape != (2, 2):
-            cost = self.table[1:-1, 1:-1]
-            n, m = cost.shape
-
-            # compute U and V
-            U = np.max(cost, 1)
-            V = np.max(cost, 0)
+        while self.row_active.any() and self.col_active.any():
 
-            # compute reduced cost
-            for i in range(n):
-                for j in range(m):
-                    self.table[i + 1, j + 1] -= U[i] + V[j]
-
-            # find the most negative
-            mins = np.min(self.table[1:-1, 1:-1])
-            x, y = np.argwhere(self.table[1:-1, 1:-1] == mins)[0]
+            # the most negative Δ over all rows, first in row-major order
+            x = np.argmin(self.best)
+            y = self.best_col[x]
 
             # allocate
-            self.allocate(x + 1, y + 1)
+            self.allocate(x, y)
 
             if show_iter:
-                self.trans.print_frame(self.table)
+                self.show()
 
         return np.array(self.alloc, dtype=object)
 
+    def show(self):
+        rows = self.row_active
+        cols = self.col_active
+        self.trans.print_frame(self.trans.build_table(
+            self.cost[np.ix_(rows, cols)], self.supply[rows], self.demand[cols],
+            self.trans.row_labels[rows], self.trans.col_labels[cols]))
+
 
 if __name__ == "__main__":
     #example1_from_reference_thesis_3x4
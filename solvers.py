@@ -0,0 +1,77 @@
+"""
+Common entry point for the optimal transportation solvers.
+
+    trans = Transportation(cost, supply, demand)
+    trans.setup_table()
+    alloc, total, solver = solve(trans)
+
+alloc maps (row, column) indices to flows, total is the cost in original
+units and solver is the finished solver instance (status, stats, u, v).
+New methods are added to SOLVERS with register().
+"""
+
+import inspect
+from vogels_approximation import VogelsApproximationMethod
+from russels_approximation import RussellsApproximationMethod
+from modi import MODI
+from network_simplex import NetworkSimplex
+from successive_shortest_path import SuccessiveShortestPath
+from cost_scaling import CostScaling
+from auction import Auction
+from assignment import JonkerVolgenant
+from sinkhorn import Sinkhorn
+
+IBFS = {"vam": VogelsApproximationMethod, "ram": RussellsApproximationMethod}
+SOLVERS = {}
+
+
+def register(name, factory):
+    """factory(trans, bfs, **options) returns a solver with a solve() method."""
+    SOLVERS[name] = factory
+
+
+def initial_solution(trans, ibfs):
+    if ibfs not in IBFS:
+        raise ValueError(f"unknown IBFS method: {ibfs!r}")
+    return IBFS[ibfs](trans).solve()
+
+
+def solve(trans, method="auto", ibfs=None, budget=None, **options):
+    """
+    Solve a prepared Transportation (setup_table already called).
+
+    method="auto" picks the assignment solver when trans.is_assignment()
+    and network_simplex otherwise.
+
+    ibfs names the method for the starting solution ("vam" or "ram"); MODI
+    needs one and defaults to "vam", network_simplex can do without, and ssp,
+    cost_scaling, auction and sinkhorn always start from scratch. budget is
+    passed on to the solver's solve(): every method takes max_iter (pivots,
+    augmentations, phases or passes, whatever its unit of work is) and
+    time_limit, MODI also gap_tolerance. options go to its constructor.
+    """
+    if method == "auto":
+        method = "assignment" if trans.is_assignment() and ibfs is None else "network_simplex"
+    if method not in SOLVERS:
+        raise ValueError(f"unknown solver: {method!r}")
+    if ibfs is None and method == "modi":
+        ibfs = "vam"
+    bfs = initial_solution(trans, ibfs) if ibfs else None
+    solver = SOLVERS[method](trans, bfs, **options)
+    budget = budget or {}
+    accepted = inspect.signature(solver.solve).parameters
+    unknown = sorted(set(budget) - set(accepted))
+    if unknown:
+        raise ValueError(f"{method} does not take budget {', '.join(unknown)} "
+                         f"(accepted: {', '.join(accepted)})")
+    alloc, total = solver.solve(**budget)
+    return alloc, total, solver
+
+
+register("modi", MODI)
+register("network_simplex", NetworkSimplex)
+register("ssp", SuccessiveShortestPath)
+register("cost_scaling", CostScaling)
+register("auction", Auction)
+register("assignment", JonkerVolgenant)
+register("sinkhorn", Sinkhorn)
@@ -0,0 +1,165 @@
+import time
+import heapq
+import numpy as np
+from transportation import Transportation, dual_bound, flow_cost
+
+
+class SuccessiveShortestPath:
+    """
+    Successive shortest path min-cost flow on the transportation network.
+
+    Every augmentation runs Dijkstra on reduced costs from all rows that
+    still have supply to the nearest column that still has demand, then
+    pushes as much as the path allows. Columns are relaxed from a row in one
+    vectorized step (their tentative distances live in an array); rows are
+    only reached back over cells that carry flow and go through a heap.
+    Potentials pi are kept between augmentations so reduced costs
+    cost + pi[row] - pi[column] never go negative; in MODI terms
+    u = -pi[rows] and v = pi[columns], with u_i + v_j = cost_ij on every
+    cell that carries flow.
+
+    The number of augmentations is bounded by the total supply for integer
+    data, which makes this a good fit when that is small relative to n*m.
+    """
+
+    def __init__(self, trans, bfs=None, tol=1e-9):
+        if not isinstance(trans, Transportation):
+            raise TypeError("SuccessiveShortestPath needs a Transportation instance")
+        if bfs is not None:
+            raise ValueError("successive shortest path starts from the empty flow")
+        self.trans = trans
+        self.cost = trans.cost
+        self.scale = trans.scale
+        self.n, self.m = self.cost.shape
+        self.tol = tol
+        self.supply = trans.supply
+        self.demand = trans.demand
+
+        self.rest_supply = trans.supply.astype(float)
+        self.rest_demand = trans.demand.astype(float)
+        self.alloc = {}
+        self.col_rows = [set() for _ in range(self.m)]
+        # rows start at 0, columns at their cheapest cost: all reduced costs >= 0
+        self.pi = np.concatenate([np.zeros(self.n), self.cost.min(axis=0)])
+        self.stats = {"augmentations": 0, "settled": 0}
+
+    @property
+    def u(self):
+        return -self.pi[:self.n]
+
+    @property
+    def v(self):
+        return self.pi[self.n:]
+
+    def _shortest_path(self):
+        """
+        Dijkstra up to the nearest column with demand left. Returns that
+        column, or None, and leaves the search tree in pred_col/pred_row.
+        """
+        n, m, cost, tol = self.n, self.m, self.cost, self.tol
+        pi_row, pi_col = self.pi[:n], self.pi[n:]
+        dist = np.full(n + m, np.inf)
+        col_dist = np.full(m, np.inf)
+        col_done = np.zeros(m, dtype=bool)
+        row_done = np.zeros(n, dtype=bool)
+        self.pred_col = pred_col = np.full(m, -1)
+        self.pred_row = pred_row = [-1] * n
+
+        heap = [(0.0, int(i)) for i in np.flatnonzero(self.rest_supply > tol)]
+        dist[[i for _, i in heap]] = 0.0
+
+        target = None
+        while True:
+            while heap and row_done[heap[0][1]]:
+                heapq.heappop(heap)
+            j = int(np.argmin(col_dist))
+            d = col_dist[j]
+
+            if heap and heap[0][0] <= d:
+                d, i = heapq.heappop(heap)
+                row_done[i] = True
+                reach = d + cost[i] + pi_row[i] - pi_col
+                better = (reach < col_dist) & ~col_done
+                col_dist[better] = reach[better]
+                pred_col[better] = i
+                continue
+
+            if d == np.inf:
+                break
+            col_done[j] = True
+            col_dist[j] = np.inf
+            dist[n + j] = d
+            self.stats["settled"] += 1
+            if self.rest_demand[j] > tol:
+                target = j
+                break
+            for i in self.col_rows[j]:
+                if row_done[i]:
+                    continue
+                reach = d - cost[i, j] + pi_col[j] - pi_row[i]
+                if reach < dist[i]:
+                    dist[i] = reach
+                    pred_row[i] = j
+                    heapq.heappush(heap, (reach, i))
+
+        if target is not None:
+            # unsettled nodes are at least as far as the target
+            self.pi += np.minimum(dist, dist[n + target])
+        return target
+
+    def _augment(self, target):
+        path, j = [], target
+        while True:
+            i = int(self.pred_col[j])
+            path.append((i, j))
+            if self.pred_row[i] < 0:
+                break
+            j = self.pred_row[i]
+            path.append((i, j))
+
+        # even positions gain flow, odd positions (cells walked backwards) lose it
+        source = path[-1][0]
+        amount = min(self.rest_supply[source], self.rest_demand[target],
+                     *(self.alloc[cell] for cell in path[1::2]))
+        for k, (i, j) in enumerate(path):
+            value = self.alloc.get((i, j), 0) + (amount if k % 2 == 0 else -amount)
+            if value > self.tol:
+                self.alloc[i, j] = value
+                self.col_rows[j].add(i)
+            else:
+                self.alloc.pop((i, j), None)
+                self.col_rows[j].discard(i)
+        self.rest_supply[source] -= amount
+        self.rest_demand[target] -= amount
+
+    def lower_bound(self):
+        """dual_bound() from the column potentials left by the last Dijkstra."""
+        return dual_bound(self.cost, self.v, self.supply, self.demand, self.scale)
+
+    def solve(self, max_iter=None, time_limit=None):
+        """
+        Augment until all supply is shipped or a budget (max_iter
+        augmentations, time_limit seconds) runs out; self.status tells which.
+        Returns the positive flows as {(i, j): value} and their cost.
+        """
+        began = time.perf_counter()
+        while True:
+            if not (self.rest_supply > self.tol).any():
+                self.status = "optimal"
+                break
+            if max_iter is not None and self.stats["augmentations"] >= max_iter:
+                self.status = "iteration_limit"
+                break
+            if time_limit is not None and time.perf_counter() - began >= time_limit:
+                self.status = "time_limit"
+                break
+            target = self._shortest_path()
+            if target is None:
+                self.status = "infeasible"
+                break
+            self._augment(target)
+            self.stats["augmentations"] += 1
+        return self.alloc, self.cost_value()
+
+    def cost_value(self):
+        return flow_cost(self.cost, self.alloc, self.scale)
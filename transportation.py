@@ -1,41 +1,244 @@
 import numpy as np
 import pandas as pd
 
+
+def _numeric(a, copy=True):
+    """Contiguous int64 array for integral input, float64 otherwise."""
+    a = np.asarray(a)
+    dtype = np.int64 if np.issubdtype(a.dtype, np.integer) else np.float64
+    if not copy:
+        return np.asarray(a, dtype=dtype, order="C")
+    return np.array(a, dtype=dtype, order="C")
+
+
+def scale_to_int(a, max_decimals=6, limit=2 ** 53):
+    """
+    Scale `a` by the smallest power of ten (at most 10**max_decimals) that
+    makes it integral and return it as int64 together with that scale.
+    Raises ValueError if no such power exists or a scaled value reaches limit.
+    """
+    a = np.asarray(a)
+    if np.issubdtype(a.dtype, np.integer):
+        scaled, scale = a.astype(np.int64), 1
+    else:
+        for k in range(max_decimals + 1):
+            exact = a * 10.0 ** k
+            scaled = np.rint(exact)
+            if np.all(np.abs(exact - scaled) <= 1e-9 * np.maximum(1.0, np.abs(exact))):
+                break
+        else:
+            raise ValueError(f"values need more than {max_decimals} decimals")
+        scale = 10 ** k
+    if scaled.size and np.abs(scaled).max() >= limit:
+        raise ValueError(f"scaled values overflow the integer range (limit {limit})")
+    return scaled.astype(np.int64), scale
+
+
+def dual_bound(cost, v, supply, demand, scale=1):
+    """
+    Lower bound on the optimal cost from column potentials v (u_i + v_j =
+    cost_ij on basic cells): with v fixed, u_i = min_j(cost_ij - v_j) is
+    dual feasible, and lifting v to v_j = min_i(cost_ij - u_i) afterwards
+    keeps it so and can only raise it. Divided by scale, i.e. in the
+    original cost units.
+    """
+    u = (cost - v[None, :]).min(axis=1)
+    v = (cost - u[:, None]).min(axis=0)
+    return float(supply @ u + demand @ v) / scale
+
+
+def flow_cost(cost, alloc, scale=1):
+    """Cost of the flows {(i, j): value} in the original units."""
+    total = sum(cost[i, j] * x for (i, j), x in alloc.items())
+    return total / scale if scale != 1 else total
+
+
+class UnionFind:
+    """Disjoint sets over 0..size-1 (rows, then columns) with path halving."""
+
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, x):
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(self, a, b):
+        """Join the sets of a and b; False if they already were one."""
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return False
+        self.parent[a] = b
+        return True
+
+
+def _readonly(a):
+    view = a.view()
+    view.flags.writeable = False
+    return view
+
+
 class Transportation:
+    """
+    Transportation problem with a typed cost matrix and supply/demand vectors.
+
+    Solvers only read `cost` (exposed as a read-only view), so one instance can
+    be shared by several solver runs. With copy=False an already typed cost
+    array, e.g. one backed by multiprocessing.shared_memory, is used as is
+    when the problem is balanced; otherwise it is copied once. The cost orders
+    of the incremental VAM/RAM engines are O(n*m) as well; processes share
+    them through set_orders(), otherwise each one builds its own.
 
-    def __init__(self, cost, supply, demand):
+    setup_table(integer=True) switches to exact integer arithmetic: costs are
+    scaled to int64 by `scale` (costs in the original units are cost / scale)
+    and supply/demand must be whole numbers, so every IBFS and MODI flow
+    stays integral (MODI switches to its integer mode on such a problem).
+    """
 
-        self.n, self.m = cost.shape
+    def __init__(self, cost, supply, demand, copy=True):
 
-        self.table = np.zeros((self.n + 2, self.m + 2), dtype=object)
-        self.table[1:-1, 1:-1] = cost.copy()
-        self.table[-1, 1:-1] = demand.copy()
-        self.table[1:-1, -1] = supply.copy()
-        self.table[0, 1::] = [f"C{i}" for i in range(self.m)] + ['Supply']
-        self.table[1::, 0] = [f"R{i}" for i in range(self.n)] + ['Demand']
+        self.n, self.m = np.shape(cost)
+
+        # typed numeric core, labels are kept apart from the numbers
+        supply = _numeric(supply)
+        demand = _numeric(demand)
+        if supply.dtype != demand.dtype:
+            supply = supply.astype(np.float64)
+            demand = demand.astype(np.float64)
+
+        # the zero-cost dummy row/column needed to balance the problem is
+        # reserved up front, so setup_table only has to widen the views
+        gap = supply.sum() - demand.sum()
+        dn, dm = int(gap < 0), int(gap > 0)
+
+        self._shared = not copy and not (dn or dm)
+        if self._shared:
+            self._cost = _numeric(cost, copy=False)
+        else:
+            cost = _numeric(cost, copy=False)
+            self._cost = np.zeros((self.n + dn, self.m + dm), dtype=cost.dtype)
+            self._cost[:self.n, :self.m] = cost
+        self._supply = np.zeros(self.n + dn, dtype=supply.dtype)
+        self._supply[:self.n] = supply
+        self._demand = np.zeros(self.m + dm, dtype=demand.dtype)
+        self._demand[:self.m] = demand
+
+        self._row_labels = np.array([f"R{i}" for i in range(self.n)] + ['Dummy'] * dn, dtype=object)
+        self._col_labels = np.array([f"C{j}" for j in range(self.m)] + ['Dummy'] * dm, dtype=object)
+
+        self.dummy = None
+        self.scale = 1
+        self._orders = None
+        self.cost = _readonly(self._cost[:self.n, :self.m])
+        self.supply = self._supply[:self.n]
+        self.demand = self._demand[:self.m]
+        self.row_labels = self._row_labels[:self.n]
+        self.col_labels = self._col_labels[:self.m]
+
+    def setup_table(self, minimize=True, integer=False):
 
-    def setup_table(self, minimize=True):
-        
         if not minimize:
             #if problem is maximization then change to minimization
-            #by substracting all cost from maximum cost
-            cost = self.table[1:-1, 1:-1]
-            self.table[1:-1, 1:-1] = np.max(cost) - cost
-        
+            #by substracting all cost from maximum cost (in place,
+            #unless the buffer is shared with someone else)
+            cost = self._cost[:self.n, :self.m]
+            if self._shared:
+                self._cost = cost.max() - cost
+                self._shared = False
+            else:
+                np.subtract(cost.max(), cost, out=cost)
+
         #sum(supply) - sum(demand)
-        gap = self.table[1:-1, -1].sum() - self.table[-1, 1:-1].sum()
+        gap = self._supply[:self.n].sum() - self._demand[:self.m].sum()
 
         if gap > 0:
-            #add dummy column
-            dummy = np.array(['Dummy'] + ([0] * self.n) + [gap], dtype=object)
-            self.table = np.insert(self.table, -1, dummy, axis=1)
+            #use the reserved dummy column
+            self._demand[-1] = gap
+            self.dummy = 'col'
         elif gap < 0:
-            #add dummy row
-            dummy = np.array(['Dummy'] + ([0] * self.m) + [-gap], dtype=object)
-            self.table = np.insert(self.table, -1, dummy, axis=0)
+            #use the reserved dummy row
+            self._supply[-1] = -gap
+            self.dummy = 'row'
+
+        if integer:
+            self._to_integer()
+
+        self._orders = None
+        self.cost = _readonly(self._cost)
+        self.supply = self._supply
+        self.demand = self._demand
+        self.row_labels = self._row_labels
+        self.col_labels = self._col_labels
 
-        self.table[-1, -1] = self.table[1:-1, -1].sum()
-        self.table = np.array(self.table,  dtype=object)
+    def _to_integer(self):
+        quantities = []
+        for q in (self._supply, self._demand):
+            if not np.array_equal(q, np.rint(q)):
+                raise ValueError("integer mode needs whole-number supply and demand")
+            quantities.append(q.astype(np.int64))
+        self._supply, self._demand = quantities
+
+        # potentials are sums of up to n+m costs and must stay exact in
+        # float64; the total cost must fit in int64
+        total = max(1, int(self._supply.sum()))
+        limit = min(2 ** 53 // (self._cost.shape[0] + self._cost.shape[1]), 2 ** 63 // total)
+        self._cost, self.scale = scale_to_int(self._cost, limit=limit)
+        self._shared = False
+
+    def is_assignment(self):
+        """Square problem with every supply and every demand equal to 1."""
+        n, m = self.cost.shape
+        return n == m and bool((self.supply == 1).all() and (self.demand == 1).all())
+
+    def orders(self):
+        """
+        Stable ascending argsort of every row and every column of `cost`.
+        Computed once and shared (read-only) by all VAM/RAM runs on this
+        problem, as int32 whenever the dimensions allow (8 bytes per cell for
+        the pair). Each Transportation builds its own unless set_orders()
+        hands it a pair computed elsewhere.
+        """
+        if self._orders is None:
+            n, m = self.cost.shape
+            dtype = np.int32 if max(n, m) < 2 ** 31 else np.intp
+            self._orders = (_readonly(np.argsort(self.cost, axis=1, kind="stable").astype(dtype)),
+                            _readonly(np.argsort(self.cost.T, axis=1, kind="stable").astype(dtype)))
+        return self._orders
+
+    def set_orders(self, row_order, col_order):
+        """
+        Use precomputed orders (as returned by orders() on the same, set up
+        problem) without copying them, e.g. arrays backed by
+        multiprocessing.shared_memory, so that processes attached to one cost
+        buffer also share the orders. setup_table() drops them again.
+        """
+        row_order, col_order = np.asarray(row_order), np.asarray(col_order)
+        if row_order.shape != self.cost.shape or col_order.shape != self.cost.T.shape:
+            raise ValueError("orders do not match the shape of the cost matrix")
+        if not (np.issubdtype(row_order.dtype, np.integer) and np.issubdtype(col_order.dtype, np.integer)):
+            raise ValueError("orders must be integer index arrays")
+        self._orders = (_readonly(row_order), _readonly(col_order))
+
+    @property
+    def table(self):
+        """Labelled object table of the current problem, built for display only."""
+        return self.build_table(self.cost, self.supply, self.demand,
+                                self.row_labels, self.col_labels)
+
+    @staticmethod
+    def build_table(cost, supply, demand, row_labels, col_labels):
+        n, m = cost.shape
+        table = np.zeros((n + 2, m + 2), dtype=object)
+        table[1:-1, 1:-1] = cost
+        table[-1, 1:-1] = demand
+        table[1:-1, -1] = supply
+        table[-1, -1] = supply.sum()
+        table[0, 1::] = list(col_labels) + ['Supply']
+        table[1::, 0] = list(row_labels) + ['Demand']
+        return table
 
     def print_frame(self, table):
         df = pd.DataFrame(table[1:, 1:])
@@ -45,23 +248,23 @@ class Transportation:
 
     def print_table(self, allocation):
         alloc = [[i, j] for i, j, _ in allocation]
-        
+
         cost, total = [], 0
-        for i, x in enumerate(self.table[1:-1, 0]):
+        for i, x in enumerate(self.row_labels):
             temp = []
-            for j, y in enumerate(self.table[0, 1:-1]):
-                v = self.table[i + 1, j + 1]
+            for j, y in enumerate(self.col_labels):
+                v = self.cost[i, j] / self.scale if self.scale != 1 else self.cost[i, j]
                 try:
                     z = alloc.index([x, y])
-                    cell = f"{v}({allocation[z, -1]})"
-                    total += v * allocation[z, -1]
+                    cell = f"{v}({allocation[z][-1]})"
+                    total += v * allocation[z][-1]
                 except ValueError:
                     cell = f"{v}"
                 temp.append(cell)
             cost.append(temp)
 
-        table = self.table.copy()
+        table = self.table
         table[1:-1, 1:-1] = cost
 
-        self.print_frame(np.array(table))
-        print("TOTAL COST: {}".format(total))
\ No newline at end of file
+        self.print_frame(table)
+        print("TOTAL COST: {}".format(total))
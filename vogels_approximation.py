@@ -7,81 +7,169 @@ from modi import MODI  # <-- UPDATED import
 class VogelsApproximationMethod:
     """
     Vogel's Approximation Method (VAM) or penalty method
+
+    backend="incremental" keeps the penalties up to date as rows/columns are
+    removed, backend="vectorized" recomputes them with np.partition over the
+    active block every step. Both yield the same allocation.
     """
 
-    def __init__(self, trans):
+    BACKENDS = ("incremental", "vectorized")
+
+    def __init__(self, trans, backend="incremental"):
+        if backend not in self.BACKENDS:
+            raise ValueError(f"unknown VAM backend: {backend!r}")
         self.trans = trans
-        self.table = trans.table.copy()
+        self.backend = backend
+        # the cost matrix is only read; satisfied rows/columns are masked out
+        self.cost = trans.cost
+        self.supply = trans.supply.copy()
+        self.demand = trans.demand.copy()
+        self.row_active = np.ones(len(self.supply), dtype=bool)
+        self.col_active = np.ones(len(self.demand), dtype=bool)
         self.alloc = []
 
+        if backend == "incremental":
+            # every row/column keeps its cells presorted by cost, with pointers
+            # (positions in that order) to its two cheapest active cells
+            n, m = self.cost.shape
+            self.row_order, self.col_order = trans.orders()
+            self.row_first = np.zeros(n, dtype=np.intp)
+            self.row_second = np.ones(n, dtype=np.intp)
+            self.col_first = np.zeros(m, dtype=np.intp)
+            self.col_second = np.ones(m, dtype=np.intp)
+
+            self.row_penalty = self.penalty(self.cost, self.row_order, self.row_first,
+                                            self.row_second, np.arange(n))
+            self.col_penalty = self.penalty(self.cost.T, self.col_order, self.col_first,
+                                            self.col_second, np.arange(m))
+
     def allocate(self, x, y):
-        mins = min([self.table[x, -1], self.table[-1, y]])
-        self.alloc.append([self.table[x, 0], self.table[0, y], mins])
+        mins = min(self.supply[x], self.demand[y])
+        self.alloc.append([self.trans.row_labels[x], self.trans.col_labels[y], mins.item()])
 
-        if self.table[x, -1] < self.table[-1, y]:
-            self.table = np.delete(self.table, x, 0)
-            self.table[-1, y] -= mins
+        if self.supply[x] < self.demand[y]:
+            self._remove_row(x)
+            self.demand[y] -= mins
 
-        elif self.table[x, -1] > self.table[-1, y]:
-            self.table = np.delete(self.table, y, 1)
-            self.table[x, -1] -= mins
+        elif self.supply[x] > self.demand[y]:
+            self._remove_col(y)
+            self.supply[x] -= mins
 
         else:
-            self.table = np.delete(self.table, x, 0)
-            self.table = np.delete(self.table, y, 1)
-
-    def penalty(self, cost):
-        gaps = np.zeros(cost.shape[0])
-        for i, c in enumerate(cost):
-            try:
-                x, y = sorted(c)[:2]
-            except ValueError:
-                x, y = c[0], 0
-            gaps[i] = abs(x - y)
-        return gaps
+            self._remove_row(x)
+            self._remove_col(y)
+
+    def _remove_row(self, x):
+        self.row_active[x] = False
+        if self.backend == "incremental":
+            self.row_penalty[x] = -np.inf
+            cols = self._advance(self.col_order, self.col_first, self.col_second,
+                                 self.col_active, self.row_active, x)
+            self.col_penalty[cols] = self.penalty(self.cost.T, self.col_order, self.col_first,
+                                                  self.col_second, cols)
+
+    def _remove_col(self, y):
+        self.col_active[y] = False
+        if self.backend == "incremental":
+            self.col_penalty[y] = -np.inf
+            rows = self._advance(self.row_order, self.row_first, self.row_second,
+                                 self.row_active, self.col_active, y)
+            self.row_penalty[rows] = self.penalty(self.cost, self.row_order, self.row_first,
+                                                  self.row_second, rows)
+
+    @staticmethod
+    def _advance(order, first, second, lines_active, cells_active, removed):
+        """Moves the pointers of lines whose cheapest or second cheapest cell was removed."""
+        k = order.shape[1]
+        lines = np.flatnonzero(lines_active)
+        hit = order[lines, first[lines]] == removed
+        has2 = second[lines] < k
+        hit[has2] |= order[lines[has2], second[lines[has2]]] == removed
+        lines = lines[hit]
+
+        for i in lines:
+            row = order[i]
+            p = first[i]
+            while p < k and not cells_active[row[p]]:
+                p += 1
+            q = max(second[i], p + 1)
+            while q < k and not cells_active[row[q]]:
+                q += 1
+            first[i], second[i] = p, q
+        return lines[first[lines] < k]
+
+    def penalty(self, cost, order, first, second, lines):
+        # gap between the two cheapest active cells, or the cell itself if alone
+        k = order.shape[1]
+        x = cost[lines, order[lines, first[lines]]]
+        y = np.zeros_like(x)
+        has2 = second[lines] < k
+        y[has2] = cost[lines[has2], order[lines[has2], second[lines[has2]]]]
+        return np.abs(x - y).astype(np.float64)
+
+    @staticmethod
+    def _partition_penalty(block):
+        if block.shape[1] == 1:
+            return np.abs(block[:, 0]).astype(np.float64)
+        two = np.partition(block, 1, axis=1)
+        return np.abs(two[:, 0] - two[:, 1]).astype(np.float64)
+
+    def _block_penalty(self):
+        """Row and column penalties recomputed over the whole active block."""
+        rows = np.flatnonzero(self.row_active)
+        cols = np.flatnonzero(self.col_active)
+        block = self.cost[np.ix_(rows, cols)]
+
+        row_penalty = np.full(len(self.row_active), -np.inf)
+        col_penalty = np.full(len(self.col_active), -np.inf)
+        row_penalty[rows] = self._partition_penalty(block)
+        col_penalty[cols] = self._partition_penalty(block.T)
+        return row_penalty, col_penalty
+
+    def _select(self, row_penalty, col_penalty):
+        """
+        Cell with the largest possible allocation among the cheapest active
+        cells of the lines with maximum penalty. Candidates are ordered rows
+        first, then columns, each by index, and the first maximum wins.
+        """
+        top = max(row_penalty.max(), col_penalty.max())
+        tr = np.flatnonzero(row_penalty == top)
+        tc = np.flatnonzero(col_penalty == top)
+
+        L = np.where(self.col_active, self.cost[tr], np.inf)
+        r1, c1 = np.nonzero(L == L.min(axis=1, keepdims=True))
+        L = np.where(self.row_active, self.cost[:, tc].T, np.inf)
+        c2, r2 = np.nonzero(L == L.min(axis=1, keepdims=True))
+
+        r = np.concatenate([tr[r1], r2])
+        c = np.concatenate([c1, tc[c2]])
+        k = np.argmax(np.minimum(self.supply[r], self.demand[c]))
+        return r[k], c[k]
 
     def solve(self, show_iter=False):
 
-        while self.table.shape != (2, 2):
-
-            cost = self.table[1:-1, 1:-1]
-            supply = self.table[1:-1, -1]
-            demand = self.table[-1, 1:-1]
-            n = cost.shape[0]
-
-            row_penalty = self.penalty(cost)
-            col_penalty = self.penalty(cost.T)
+        while self.row_active.any() and self.col_active.any():
 
-            P = np.append(row_penalty, col_penalty)
+            if self.backend == "vectorized":
+                row_penalty, col_penalty = self._block_penalty()
+            else:
+                row_penalty, col_penalty = self.row_penalty, self.col_penalty
 
-            max_alloc = -np.inf
-            for i in np.where(P == max(P))[0]:
-
-                if i - n < 0:
-                    r = i
-                    L = cost[r]
-                else:
-                    c = i - n
-                    L = cost[:, c]
-
-                for j in np.where(L == min(L))[0]:
-                    if i - n < 0:
-                        c = j
-                    else:
-                        r = j
-
-                    alloc = min([supply[r], demand[c]])
-                    if alloc > max_alloc:
-                        max_alloc = alloc
-                        x, y = r, c
-
-            self.allocate(x + 1, y + 1)
+            x, y = self._select(row_penalty, col_penalty)
+            self.allocate(x, y)
 
             if show_iter:
-                self.trans.print_frame(self.table)
+                self.show()
 
         return np.array(self.alloc, dtype=object)
 
+    def show(self):
+        rows = self.row_active
+        cols = self.col_active
+        self.trans.print_frame(self.trans.build_table(
+            self.cost[np.ix_(rows, cols)], self.supply[rows], self.demand[cols],
+            self.trans.row_labels[rows], self.trans.col_labels[cols]))
+
 
 # ==========================================================
 # MAIN EXECUTION (VAM → MODI)